@@ -4,51 +4,64 @@ Generates test frames with SYNC headers, payloads of two bytes per item, and a C
 Includes tools for generating noise and parsing frames from noisy streams.
 """
 
-from collections import deque
-from construct import Struct, Const, Int16ub, Array, this, Checksum
-import crcmod
+import binascii
+from functools import lru_cache
 import io
 import logging
 import random
-from typing import BinaryIO
+import struct
+from typing import Union
 
 # Define the frame start
 SYNC = b'\xBE\xEF'
 
+# Initial size of the preallocated stream read buffer
+BUFFER_SIZE = 64 * 1024
+
 # Describes the layout of a single frame:
 #   - sync      : Two bytes, fixed 0xBEEF, marks frame start
 #   - length    : Two bytes, unsigned big-endian, number of two byte payload items
 #   - payload   : List of two byte big-endian unsigned integers
 #   - crc       : Two bytes, CRC-16-CCITT over sync + length + payload, provides basic error detection
-Frame = Struct(
-    "sync" / Const(SYNC),
-    "length" / Int16ub,
-    "payload" / Array(this.length, Int16ub),
-    "crc" / Int16ub
-)
-
-# Pre-create CRC-16-CCITT funciton for performance
-_crc_func = crcmod.mkCrcFun(
-        0x11021,
-        initCrc = 0xFFFF,
-        rev = False,
-        xorOut = 0x0000
-)
+
+# Compiled structs for the fixed size frame fields, the header skips over the sync bytes
+_HDR = struct.Struct('>2xH')
+_CRC = struct.Struct('>H')
+
+# CRC-16-CCITT initial value (poly 0x1021, non-reflected, no final XOR)
+CRC_INIT = 0xFFFF
 
 # Create logger from logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-def crc16_ccitt(data: bytes) -> int:
+def crc16_ccitt(data: Union[bytes, bytearray, memoryview], crc: int = CRC_INIT) -> int:
     """Computes CRC-16-CCITT checksum for the provided data
     
+    Uses binascii.crc_hqx, a C table-driven implementation of the same
+    polynomial (0x1021), which accepts any bytes-like object. Passing a
+    previous result as crc continues the checksum over the next piece of data.
+
     Args:
-        data (bytes): Input data to compute CRC over.
+        data (Union[bytes, bytearray, memoryview]): Input data to compute CRC over.
+        crc (int, optional): Running CRC value to start from, defaults to CRC_INIT.
         
     Returns:
         int: Computed CRC-16-CCITT value.
     """
-    return _crc_func(data)
+    return binascii.crc_hqx(data, crc)
+
+@lru_cache(maxsize=64)
+def _payload_struct(payload_len: int) -> struct.Struct:
+    """Returns a compiled struct for a payload with the given number of items.
+
+    Args:
+        payload_len (int): Number of two byte payload items.
+
+    Returns:
+        struct.Struct: Big-endian layout of the payload items.
+    """
+    return struct.Struct(f">{payload_len}H")
 
 def make_frame(payload_len: int = 6) -> bytes:
     """Generates a frame with SYNC, payload length, payload, and CRC.
@@ -59,13 +72,12 @@ def make_frame(payload_len: int = 6) -> bytes:
     Returns:
         bytes: The generated frame (SYNC + length + payload + CRC).
     """
-    # Two byte length, six byte payload, two byte CRC
-    payload_items = [random.randint(0,0xFFFF) for _ in range(payload_len)]
-    payload = b''.join(item.to_bytes(2, 'big') for item in payload_items)
-    length = payload_len.to_bytes(2,'big') # 2-byte big-endian
-    crc_val = crc16_ccitt(SYNC + length + payload)
+    # Two byte length, two bytes per payload item, two byte CRC
+    payload = random.randbytes(payload_len * 2)
+    header = SYNC + payload_len.to_bytes(2,'big') # 2-byte big-endian length
+    crc_val = crc16_ccitt(payload, crc16_ccitt(header))
     crc = crc_val.to_bytes(2, 'big')
-    return SYNC + length + payload + crc
+    return header + payload + crc
 
 def make_noise() -> bytes:
     """Generates random noise bytes of random length between 1 and 4.
@@ -73,75 +85,104 @@ def make_noise() -> bytes:
     Returns:
         bytes: Random noise bytes.
     """
-    return bytes(random.randint(0, 255) for _ in range(random.randint(1,4)))
+    return random.randbytes(random.randint(1,4))
 
-def find_sync(buffer: deque[int]) -> int:
+def find_sync(buffer: bytearray, start: int = 0) -> int:
     """Find the index of the SYNC in the buffer.
 
+    Kept as a public helper, read_serial_stream calls buffer.find directly.
+
     Args:
-        buffer (deque[int]): The byte buffer to search
+        buffer (bytearray): The byte buffer to search
+        start (int, optional): Index to begin searching from, defaults to 0.
 
     Returns:
         int: Index of sync start, or -1 if not found.
     """
-    buf = list(buffer)
-    for i in range(len(buf) - 1):
-         if buf[i] == 0xBE and buf[i + 1] == 0xEF:
-              return i
-    return -1    
+    return buffer.find(SYNC, start)
 
-def read_serial_stream(stream: BinaryIO, chunk_size: int = 8) -> None:
+def read_serial_stream(stream: Union[io.BufferedIOBase, io.RawIOBase], chunk_size: int = 4096) -> None:
     """Reads a serial data stream and parses one at a time.
 
     Continuously reads from the stream in chunks, searching for the SYNC header.
+    Chunks are read with readinto() directly into a preallocated buffer.
     Frames with invalid CRCs are reported and skipped.
 
     Args:
-        stream (BinaryIO): A binary stream object (e.g. serial port or BytesIO).
-        chunk_size (int, optional): Number of bytes to read per chunk, defaults to 8.
+        stream (Union[io.BufferedIOBase, io.RawIOBase]): A binary stream object (e.g. serial port or BytesIO).
+        chunk_size (int, optional): Number of bytes requested per readinto() call, defaults to 4096.
+            A blocking serial port (pyserial with timeout=None) waits for the full chunk before
+            any frame is parsed, so set a port timeout or pass a smaller chunk_size.
 
     Returns:
         None
     """
-    buffer = deque()
+    buffer = bytearray(BUFFER_SIZE)
+    # Index of the first unconsumed byte and one past the last received byte
+    read_pos = 0
+    write_pos = 0
+
+    # Bind names used per frame to locals, buffer is resized in place so find stays valid
+    find = buffer.find
+    sync = SYNC
+    crc16 = crc16_ccitt
+    payload_struct = _payload_struct
+    unpack_header = _HDR.unpack_from
+    unpack_crc = _CRC.unpack_from
+    log_info = logger.info
 
     while True:
-        chunk = stream.read(chunk_size)
-        # No bytes, stop reading
-        if not chunk:
-            break
-        buffer.extend(chunk)
-
-        while True:
-            idx = find_sync(buffer)
-            if idx == -1:
-                break
-
-            for _ in range(idx):
-                buffer.popleft()
-
-            if len(buffer) < 4:
-                break
-            
-            payload_len = (buffer[2] << 8 | buffer[3])
-            total_frame_len = 2 + 2 + payload_len * 2 + 2
-
-            if len(buffer) < total_frame_len:
+        # Make room for the next chunk, moving unconsumed bytes to the front first
+        if len(buffer) - write_pos < chunk_size:
+            if read_pos:
+                pending = write_pos - read_pos
+                buffer[:pending] = buffer[read_pos:write_pos]
+                read_pos = 0
+                write_pos = pending
+            # Still short, a large frame is pending, grow geometrically to keep reads amortized O(1)
+            if len(buffer) - write_pos < chunk_size:
+                buffer.extend(bytes(max(chunk_size, len(buffer))))
+
+        # The view must be released before the buffer is resized again
+        with memoryview(buffer) as view:
+            count = stream.readinto(view[write_pos:write_pos + chunk_size])
+            # No bytes, stop reading
+            if not count:
                 break
-
-            # Extract full frame
-            frame = bytes(buffer.popleft() for _ in range(total_frame_len))
-
-            # Parse frame and CRC check
-            try:
-                parsed = Frame.parse(frame)
-                computed_crc = crc16_ccitt(frame[:-2])
-                if parsed.crc == computed_crc:
-                    logger.info(f"Valid Frame: payload = {parsed.payload}")
-                else:
-                    logger.info(f"CRC mismatch: computed {computed_crc:#06x}, received {parsed.crc:#06x}, raw: {frame.hex()}")
-            except Exception as e:
-                logger.info(f"Frame parse error {e}, raw: {frame.hex()}")
+            write_pos += count
+
+            while True:
+                idx = find(sync, read_pos, write_pos)
+                if idx == -1:
+                    # Only the last byte can still begin a SYNC, don't rescan the rest
+                    read_pos = max(read_pos, write_pos - 1)
+                    break
+
+                read_pos = idx
+
+                if write_pos - read_pos < 4:
+                    break
+                
+                payload_len, = unpack_header(view, read_pos)
+                total_frame_len = 2 + 2 + payload_len * 2 + 2
+
+                if write_pos - read_pos < total_frame_len:
+                    break
+
+                # Consume the full frame, then CRC check it in place
+                start = read_pos
+                end = read_pos + total_frame_len
+                read_pos = end
+
+                # SYNC was matched by find, the payload is only unpacked once the CRC passes
+                crc, = unpack_crc(view, end - 2)
+                computed_crc = crc16(view[start:end - 2])
+                if crc == computed_crc:
+                    payload = payload_struct(payload_len).unpack_from(view, start + 4)
+                    log_info("Valid Frame: payload = %s", payload)
+                elif logger.isEnabledFor(logging.INFO):
+                    log_info("CRC mismatch: computed %#06x, received %#06x, raw: %s",
+                             computed_crc, crc, view[start:end].hex())
 
 if __name__ == "__main__":   
     # Build a fake serial stream